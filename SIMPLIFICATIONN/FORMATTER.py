@@ -1,7 +1,31 @@
+import re
+import string
+
+# Complex expressions in parentheses with arithmetic operators or comparisons
+_COMPLEX_RE = re.compile(r'\([^()]*(?:\+|-|\*|\/|==|!=|>=|<=|>|<)[^()]*\)')
+# Relational operations (< and >) inside a complex expression
+_RELATIONAL_RE = re.compile(r'([a-zA-Z][a-zA-Z0-9._]*)\s*([<>])\s*([a-zA-Z0-9._\s\+\-\*\/]+)')
+# Relational operations whose left operand may also be numeric
+_REL_OPERATION_RE = re.compile(r'([a-zA-Z0-9._]+)\s*([<>])\s*([a-zA-Z0-9._\s\+\-\*\/]+)')
+# Numeric comparisons (e.g., "19 > dw.temporalCounter_i1")
+_NUMERIC_CMP_RE = re.compile(r'\((\d+)\s*(?:[<>]=?|==|!=)\s*([a-zA-Z][a-zA-Z0-9._]*)\)')
+# Regular comparison expressions and variables
+_VAR_RE = re.compile(r'(?:[a-zA-Z][a-zA-Z0-9._]*\s*==\s*[a-zA-Z][a-zA-Z0-9._]*)|(?<!\w)[a-zA-Z][a-zA-Z0-9._]*(?!\s*==)')
+# Same as _VAR_RE, but also matches standalone numbers
+_VAR_OR_NUM_RE = re.compile(r'(?:[a-zA-Z][a-zA-Z0-9._]*\s*==\s*[a-zA-Z][a-zA-Z0-9._]*)|(?<!\w)[a-zA-Z][a-zA-Z0-9._]*(?!\s*==)|(?<!\w)\d+(?!\w)')
+# Relational operator check
+_ANGLE_RE = re.compile(r'[<>]')
+
+# Placeholder letters assigned to variables, in order
+_LETTERS = string.ascii_uppercase
+_UPPER = frozenset(_LETTERS)
+
 def simplify_logical_expression(expression):
     var_map = {}
     reverse_map = {}  
-    current_letter = 'A'
+    idx = 0
+    # Mapped keys containing '==', used to skip partial matches of comparisons
+    comparisons = []
     
     def normalize_variable(var):
         var = var.strip()
@@ -12,77 +36,83 @@ def simplify_logical_expression(expression):
         return var
     
     def extract_variables(expr):
-        import re
-        # Fix issues with spaces in variable names first
-        expr = expr.replace("dw.is_ ModeManager", "dw.is_ModeManager")
-        expr = expr.replace("IN_ NO_ACTIVE_CHILD", "IN_NO_ACTIVE_CHILD")
-        
-        # Find complex expressions in parentheses with operators and comparisons
-        complex_pattern = r'\([^()]*(?:\+|-|\*|\/|==|!=|>=|<=|>|<)[^()]*\)'
-        complex_matches = re.findall(complex_pattern, expr)
-        
-        # New pattern to match relational operations (< and >)
-        relational_pattern = r'([a-zA-Z][a-zA-Z0-9._]*)\s*([<>])\s*([a-zA-Z0-9._\s\+\-\*\/]+)'
-        
-        # Process each complex match to extract operands of relational operators
-        for complex_match in complex_matches.copy():
-            relational_matches = re.findall(relational_pattern, complex_match)
-            for left_operand, operator, right_operand in relational_matches:
-                # Add both operands to matches separately
-                if left_operand.strip() not in complex_matches:
-                    complex_matches.append(left_operand.strip())
-                if right_operand.strip() not in complex_matches:
-                    complex_matches.append(right_operand.strip())
-        
-        # Process numeric comparisons separately (e.g., "19 > dw.temporalCounter_i1")
-        numeric_comparison_pattern = r'\((\d+)\s*(?:[<>]=?|==|!=)\s*([a-zA-Z][a-zA-Z0-9._]*)\)'
-        for complex_match in complex_matches.copy():
-            numeric_matches = re.findall(numeric_comparison_pattern, complex_match)
-            if numeric_matches:
-                for num, var in numeric_matches:
-                    # Add the variable separately to matches
-                    if var not in complex_matches:
-                        complex_matches.append(var)
-                    # Add the number separately (optional, depends if you want numbers to get mapped)
-                    if num not in complex_matches:
-                        complex_matches.append(num)
-        
-        # Find regular comparison expressions and variables
-        pattern = r'(?:[a-zA-Z][a-zA-Z0-9._]*\s*==\s*[a-zA-Z][a-zA-Z0-9._]*)|(?<!\w)[a-zA-Z][a-zA-Z0-9._]*(?!\s*==)'
-        matches = []
+        # Find complex expressions in parentheses with operators and comparisons,
+        # keeping their spans so the exclusion mask comes from the same pass
+        complex_matches = [(m.span(), m.group()) for m in _COMPLEX_RE.finditer(expr)]
         
         # Add complex expressions first
-        matches.extend(complex_matches)
+        matches = {complex_match for _, complex_match in complex_matches}
+        # Simple comparisons found so far ("a == b"); complex ones start with '('
+        # and can never be a prefix match of a variable
+        found_comparisons = []
         
-        # Store positions of complex expressions to exclude them from regular variable extraction
-        excluded_ranges = []
-        for complex_match in complex_matches:
-            for m in re.finditer(re.escape(complex_match), expr):
-                excluded_ranges.append((m.start(), m.end()))
+        # Mask positions of complex expressions to exclude them from regular variable extraction
+        mask = bytearray(len(expr))
+        
+        for (start, end), complex_match in complex_matches:
+            mask[start:end] = b'\x01' * (end - start)
+            
+            # Add both operands of relational operators to matches separately
+            for left_operand, operator, right_operand in _RELATIONAL_RE.findall(complex_match):
+                matches.add(left_operand.strip())
+                matches.add(right_operand.strip())
+            
+            # Process numeric comparisons separately (e.g., "19 > dw.temporalCounter_i1")
+            for num, var in _NUMERIC_CMP_RE.findall(complex_match):
+                # Add the variable separately to matches
+                matches.add(var)
+                # Add the number separately (optional, depends if you want numbers to get mapped)
+                matches.add(num)
         
         # Process rest of expression for simple variables and comparisons
-        for match in re.finditer(pattern, expr):
-            # Only add if it's not part of a complex expression
+        pos = 0
+        while True:
+            match = _VAR_RE.search(expr, pos)
+            if match is None:
+                break
             start, end = match.span()
-            if not any(start >= ex_start and end <= ex_end for ex_start, ex_end in excluded_ranges):
-                # Only add if it's a complete expression
-                if start == 0 or not expr[start-1].isalnum():
-                    if end == len(expr) or not expr[end].isalnum():
-                        var = match.group(0)
-                        # Skip if it's just a prefix or a partial match
-                        if not (var.endswith('_') and var.count('.') == 1):
-                            # Skip if it's just a part of a comparison
-                            if '==' in var or not any('==' in m for m in matches if m.startswith(var) or var.startswith(m)):
-                                matches.append(var)
-        return sorted(set(matches))
+            # Skip straight past a complex expression instead of matching inside it
+            if mask[start]:
+                pos = mask.find(b'\x00', start)
+                if pos < 0:
+                    break
+                continue
+            pos = end
+            # Only add if it's a complete expression
+            if start == 0 or not expr[start-1].isalnum():
+                if end == len(expr) or not expr[end].isalnum():
+                    var = match.group(0)
+                    # Skip if it's just a prefix or a partial match
+                    if not (var.endswith('_') and var.count('.') == 1):
+                        # Skip if it's just a part of a comparison
+                        if '==' in var:
+                            found_comparisons.append(var)
+                            matches.add(var)
+                        elif not any(m.startswith(var) or var.startswith(m) for m in found_comparisons):
+                            matches.add(var)
+        return sorted(matches)
     
     # Replace variables in the expression
     # Fix issues with spaces before using the expression
     expression = expression.replace("dw.is_ ModeManager", "dw.is_ModeManager")
     expression = expression.replace("IN_ NO_ACTIVE_CHILD", "IN_NO_ACTIVE_CHILD")
     
+    def assign_letter(var):
+        nonlocal idx
+        if idx >= len(_LETTERS):
+            raise ValueError(
+                f"Expression has more than {len(_LETTERS)} distinct variables, "
+                f"the most that can be mapped to placeholder letters: {expression}"
+            )
+        letter = _LETTERS[idx]
+        var_map[var] = letter
+        reverse_map[letter] = var
+        idx += 1
+        if '==' in var:
+            comparisons.append(var)
+        return letter
+    
     def replace_variable(match):
-        nonlocal current_letter
         var = match.group(0).strip()
         
         # Skip if it's just a prefix
@@ -90,62 +120,64 @@ def simplify_logical_expression(expression):
             return var
             
         # Skip if it's a partial match of a comparison
-        if '==' not in var and any('==' in m for m in var_map.keys() if m.startswith(var) or var.startswith(m)):
+        if '==' not in var and any(m.startswith(var) or var.startswith(m) for m in comparisons):
             return var
         
         # Handle numeric values
         if var.isdigit():
             if var in var_map:
                 return var_map[var]
-            var_map[var] = current_letter
-            reverse_map[current_letter] = var
-            current_letter = chr(ord(current_letter) + 1)
-            return var_map[var]
+            return assign_letter(var)
         
         # If it's already mapped, return the mapping
         if var in var_map:
             return var_map[var]
         
         # If var is a single letter that might be a previous mapping, skip it
-        if len(var) == 1 and 'A' <= var <= 'Z' and var in reverse_map:
+        if var in _UPPER and var in reverse_map:
             return var
             
         # Create new mapping
-        var_map[var] = current_letter
-        reverse_map[current_letter] = var
-        current_letter = chr(ord(current_letter) + 1)
-        return var_map[var]
+        return assign_letter(var)
     
     def process_relational_operators(expr):
-        import re
-        
-        # Identify relational operations, capturing both operands
-        rel_pattern = r'([a-zA-Z0-9._]+)\s*([<>])\s*([a-zA-Z0-9._\s\+\-\*\/]+)'
-        
         def replace_relational(match):
             left_operand, operator, right_operand = match.groups()
             left_operand = left_operand.strip()
             right_operand = right_operand.strip()
             
             # Map left operand
-            if left_operand not in var_map and not (len(left_operand) == 1 and 'A' <= left_operand <= 'Z' and left_operand in reverse_map):
-                nonlocal current_letter
-                var_map[left_operand] = current_letter
-                reverse_map[current_letter] = left_operand
-                current_letter = chr(ord(current_letter) + 1)
+            if left_operand not in var_map and not (left_operand in _UPPER and left_operand in reverse_map):
+                assign_letter(left_operand)
             
             # Map right operand
-            if right_operand not in var_map and not (len(right_operand) == 1 and 'A' <= right_operand <= 'Z' and right_operand in reverse_map):
-                var_map[right_operand] = current_letter
-                reverse_map[current_letter] = right_operand
-                current_letter = chr(ord(current_letter) + 1)
+            if right_operand not in var_map and not (right_operand in _UPPER and right_operand in reverse_map):
+                assign_letter(right_operand)
             
             left_map = var_map.get(left_operand, left_operand)
             right_map = var_map.get(right_operand, right_operand)
             
             return f"{left_map} {operator} {right_map}"
         
-        return re.sub(rel_pattern, replace_relational, expr)
+        # Identify relational operations, capturing both operands
+        return _REL_OPERATION_RE.sub(replace_relational, expr)
+    
+    def rewrite_complex(match):
+        complex_expr = match.group(0)
+        # Skip if it contains a relational operator as we've already processed those
+        if _ANGLE_RE.search(complex_expr):
+            return complex_expr
+        numeric_matches = _NUMERIC_CMP_RE.findall(complex_expr)
+        if numeric_matches:
+            # Handle numeric comparison by replacing parts individually
+            modified_expr = complex_expr
+            for num, var in numeric_matches:
+                if num in var_map:
+                    modified_expr = modified_expr.replace(num, var_map[num])
+                if var in var_map:
+                    modified_expr = modified_expr.replace(var, var_map[var])
+            return modified_expr
+        return var_map.get(complex_expr, complex_expr)
     
     if '->' in expression:
         parts = expression.split('->')
@@ -162,90 +194,52 @@ def simplify_logical_expression(expression):
     for var in all_variables:
         if var not in var_map:
             # Check if var is a single letter that might already be used as a mapping
-            if len(var) == 1 and 'A' <= var <= 'Z' and var in reverse_map:
+            if var in _UPPER and var in reverse_map:
                 continue
                 
-            var_map[var] = current_letter
-            reverse_map[current_letter] = var
-            current_letter = chr(ord(current_letter) + 1)
+            assign_letter(var)
     
     # Replace variables in the expression
-    import re
-    # First replace complex expressions in parentheses
-    complex_pattern = r'\([^()]*(?:\+|-|\*|\/|==|!=|>=|<=|>|<)[^()]*\)'
-    
-    # Process numeric comparisons separately
-    numeric_comparison_pattern = r'\((\d+)\s*(?:[<>]=?|==|!=)\s*([a-zA-Z][a-zA-Z0-9._]*)\)'
-    
     # Special processing for relational operators
     simplified_left = process_relational_operators(left_part)
     
     # Replace other complex expressions
-    for complex_match in re.finditer(complex_pattern, simplified_left):
-        complex_expr = complex_match.group(0)
-        # Skip if it contains a relational operator as we've already processed those
-        if not re.search(r'[<>]', complex_expr):
-            numeric_matches = re.findall(numeric_comparison_pattern, complex_expr)
-            
-            if numeric_matches:
-                # Handle numeric comparison by replacing parts individually
-                modified_expr = complex_expr
-                for num, var in numeric_matches:
-                    if num in var_map:
-                        modified_expr = modified_expr.replace(num, var_map[num])
-                    if var in var_map:
-                        modified_expr = modified_expr.replace(var, var_map[var])
-                simplified_left = simplified_left.replace(complex_expr, modified_expr)
-            elif complex_expr in var_map:
-                simplified_left = simplified_left.replace(complex_expr, var_map[complex_expr])
+    simplified_left = _COMPLEX_RE.sub(rewrite_complex, simplified_left)
     
     # Then replace simple variables and comparisons
-    pattern = r'(?:[a-zA-Z][a-zA-Z0-9._]*\s*==\s*[a-zA-Z][a-zA-Z0-9._]*)|(?<!\w)[a-zA-Z][a-zA-Z0-9._]*(?!\s*==)|(?<!\w)\d+(?!\w)'
-    simplified_left = re.sub(pattern, replace_variable, simplified_left)
+    simplified_left = _VAR_OR_NUM_RE.sub(replace_variable, simplified_left)
     
     if right_part:
         # Process relational operators in right part
         simplified_right = process_relational_operators(right_part)
         
         # Replace complex expressions first in right part
-        for complex_match in re.finditer(complex_pattern, simplified_right):
-            complex_expr = complex_match.group(0)
-            # Skip if it contains a relational operator as we've already processed those
-            if not re.search(r'[<>]', complex_expr):
-                numeric_matches = re.findall(numeric_comparison_pattern, complex_expr)
-                
-                if numeric_matches:
-                    # Handle numeric comparison by replacing parts individually
-                    modified_expr = complex_expr
-                    for num, var in numeric_matches:
-                        if num in var_map:
-                            modified_expr = modified_expr.replace(num, var_map[num])
-                        if var in var_map:
-                            modified_expr = modified_expr.replace(var, var_map[var])
-                    simplified_right = simplified_right.replace(complex_expr, modified_expr)
-                elif complex_expr in var_map:
-                    simplified_right = simplified_right.replace(complex_expr, var_map[complex_expr])
-                    
+        simplified_right = _COMPLEX_RE.sub(rewrite_complex, simplified_right)
+        
         # Then replace simple variables and comparisons
-        simplified_right = re.sub(pattern, replace_variable, simplified_right)
+        simplified_right = _VAR_OR_NUM_RE.sub(replace_variable, simplified_right)
         simplified = f"{simplified_left} -> {simplified_right}"
     else:
         simplified = simplified_left
     
-    mapping_explanation = "\nVariable Mappings:\n"
-    
     # Directly map all letters to original expressions
-    original_mappings = {}
-    for letter, value in sorted(reverse_map.items()):
+    resolved_originals = {}
+    
+    def resolve_original(value):
         # If the value is a single letter, find its original value
-        original_value = value
-        while len(original_value) == 1 and 'A' <= original_value <= 'Z' and original_value in reverse_map:
-            original_value = reverse_map[original_value]
-        
-        original_mappings[letter] = original_value
+        if value not in _UPPER or value not in reverse_map:
+            return value
+        if value not in resolved_originals:
+            # Seed the entry first so a mapping cycle terminates instead of looping forever
+            resolved_originals[value] = value
+            resolved_originals[value] = resolve_original(reverse_map[value])
+        return resolved_originals[value]
+    
+    original_mappings = {letter: resolve_original(value) for letter, value in reverse_map.items()}
     
-    for letter in sorted(original_mappings.keys()):
-        mapping_explanation += f"{letter} -> \"{original_mappings[letter]}\"\n"
+    parts = ["\nVariable Mappings:"]
+    parts.extend(f'{letter} -> "{value}"' for letter, value in sorted(original_mappings.items()))
+    mapping_explanation = '\n'.join(parts) + '\n'
     
     return simplified, mapping_explanation
 
@@ -269,9 +263,7 @@ def main():
         
         output_file = r"B:\SIMPLIFIERLOCAL\SIMPLIFICATIONN\simplified_expression.txt"
         with open(output_file, "w", encoding='utf-8') as f:
-            f.write("logical statement: " + expression + "\n\n")
-            f.write("simplified statement : " + simplified + "\n\n")
-            f.write(mappings)
+            f.write(f"logical statement: {expression}\n\nsimplified statement : {simplified}\n\n{mappings}")
             
         print(f"\nOutput has been saved to '{output_file}'")
         
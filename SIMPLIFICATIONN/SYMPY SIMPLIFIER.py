@@ -1,5 +1,10 @@
 from sympy import symbols,Implies, simplify_logic, pretty, parse_expr, Eq
+import atexit
+import csv
+import os
 import re
+import string
+from functools import lru_cache
 # Import the formatter functionality
 try:
 
@@ -7,6 +12,39 @@ try:
 except ImportError:
     from FORMATTER import simplify_logical_expression
 
+# Basic symbols A through Z, created once and copied per expression
+_BASE_SYMBOL_MAP = {c: symbols(c) for c in string.ascii_uppercase}
+
+# Characters that never need surrounding whitespace in SymPy syntax
+_OPERATOR_CHARS = frozenset('&|!()<>')
+
+# Negations of inequalities: !(X > Y) and !(X < Y)
+_NEG_GT_RE = re.compile(r'!\(([A-Z])\s*>\s*([A-Z])\)')
+_NEG_LT_RE = re.compile(r'!\(([A-Z])\s*<\s*([A-Z])\)')
+
+def _normalize(expression):
+    """
+    Normalize whitespace in a single pass over the expression.
+    Collapses runs of whitespace and drops whitespace next to operators and parentheses.
+    
+    Args:
+        expression (str): The input expression
+    
+    Returns:
+        str: Expression with normalized whitespace
+    """
+    buf = []
+    pending_space = False
+    for char in expression:
+        if char.isspace():
+            pending_space = True
+            continue
+        if pending_space and buf and buf[-1] not in _OPERATOR_CHARS and char not in _OPERATOR_CHARS:
+            buf.append(' ')
+        pending_space = False
+        buf.append(char)
+    return ''.join(buf)
+
 def convert_to_sympy_syntax(expression):
     """
     Convert user-provided symbolic expression to valid SymPy syntax.
@@ -19,29 +57,16 @@ def convert_to_sympy_syntax(expression):
         str: Expression with SymPy-compatible operators
     """
     # Step 1: Normalize spaces
-    expr = expression.strip()
-    expr = re.sub(r'\s+', ' ', expr)  # Replace multiple spaces with single space
-    expr = re.sub(r'\s*([&|!()<>])\s*', r'\1', expr)  # Remove spaces around operators and parentheses
+    expr = _normalize(expression)
     
     # Step 2: Process negations of inequality expressions before general operator replacement
     # Transform !(X > Y) to (X <= Y) and !(X < Y) to (X >= Y)
-    # Use a loop to handle nested cases
-    prev_expr = ""
-    while prev_expr != expr:
-        prev_expr = expr
-        expr = re.sub(r'!\(([A-Z])\s*>\s*([A-Z])\)', r'(\1 <= \2)', expr)
-        expr = re.sub(r'!\(([A-Z])\s*<\s*([A-Z])\)', r'(\1 >= \2)', expr)
+    # The rewritten form no longer starts with '!', so a single pass is enough
+    expr = _NEG_GT_RE.sub(r'(\1 <= \2)', expr)
+    expr = _NEG_LT_RE.sub(r'(\1 >= \2)', expr)
     
     # Step 3: Replace operators
-    expr = expr.replace('&&', '&')
-    expr = expr.replace('||', '|')
-    expr = expr.replace('->', '>>')
-    
-    # Handle NOT operator (!) carefully
-    # First, ensure there's no space between ! and what it negates
-    expr = re.sub(r'!\s*', '!', expr)
-    # Then replace ! with ~
-    expr = expr.replace('!', '~')
+    expr = expr.replace('&&', '&').replace('||', '|').replace('->', '>>').replace('!', '~')
     
     return expr
 
@@ -96,23 +121,9 @@ def create_sympy_expression(expression):
         # First, detect and replace arithmetic expressions
         modified_expr, arith_symbols = detect_arithmetic_expressions(expression)
         
-        # Define all basic symbols (A through Z)
-        A, B, C, D, E, F, G, H, I, J, K, L, M, N, O, P, Q, R, S, T, U, V, W, X, Y, Z = symbols('A B C D E F G H I J K L M N O P Q R S T U V W X Y Z')
-        
-        # Create a dictionary of symbol mappings
-        symbol_map = {
-            'A': A, 'B': B, 'C': C, 'D': D, 'E': E, 'F': F, 'G': G, 'H': H,
-            'I': I, 'J': J, 'K': K, 'L': L, 'M': M, 'N': N, 'O': O, 'P': P,
-            'Q': Q, 'R': R, 'S': S, 'T': T, 'U': U, 'V': V, 'W': W, 'X': X,
-            'Y': Y, 'Z': Z
-        }
-        
-        # Pre-process negations of inequalities
-        # For example, convert ~(X > Y) to (X <= Y)
-        # Identify patterns like ~(A > B) and replace with (A <= B)
-        modified_expr = re.sub(r'~\(([A-Z])\s*>\s*([A-Z])\)', r'(\1 <= \2)', modified_expr)
-        # Identify patterns like ~(A < B) and replace with (A >= B)
-        modified_expr = re.sub(r'~\(([A-Z])\s*<\s*([A-Z])\)', r'(\1 >= \2)', modified_expr)
+        # Symbol mappings for A through Z; arithmetic symbols are added to the copy below
+        # Negations of inequalities were already rewritten by convert_to_sympy_syntax
+        symbol_map = _BASE_SYMBOL_MAP.copy()
         
         # Check if expression contains ">>" (implication)
         if ">>" in modified_expr:
@@ -187,6 +198,14 @@ def simplify_converted_expression(converted_expr):
         # Log the input for debugging
         print("\nInput expression for simplification:", converted_expr)
         
+        # A lone variable has nothing to simplify, so skip the SymPy round-trip
+        inner = converted_expr
+        while inner.startswith('(') and inner.endswith(')'):
+            inner = inner[1:-1]
+        symbol = _BASE_SYMBOL_MAP.get(inner)
+        if symbol is not None:
+            return symbol, symbol
+        
         # Parse the string expression into a SymPy expression
         parsed_expr = create_sympy_expression(converted_expr)
         
@@ -212,6 +231,32 @@ def simplify_converted_expression(converted_expr):
         return None, None
 
 
+# Single-character SymPy operators and their original-format spelling
+_SYMPY_BACK = {'&': '&&', '|': '||', '~': '!'}
+
+def _sympy_back(expr):
+    """
+    Rewrite SymPy operators to the original format in a single scan.
+    
+    Args:
+        expr (str): Expression string in SymPy syntax
+    
+    Returns:
+        str: Expression with &&, ||, ! and -> operators
+    """
+    buf = []
+    i = 0
+    n = len(expr)
+    while i < n:
+        char = expr[i]
+        if char == '>' and i + 1 < n and expr[i + 1] == '>':
+            buf.append('->')
+            i += 2
+            continue
+        buf.append(_SYMPY_BACK.get(char, char))
+        i += 1
+    return ''.join(buf)
+
 def convert_from_sympy_syntax(expression):
     """
     Convert SymPy expression back to original format with &&, ||, !, and -> operators.
@@ -222,14 +267,7 @@ def convert_from_sympy_syntax(expression):
     Returns:
         str: Expression with original operators
     """
-    # Replace SymPy operators with original format
-    expr = str(expression)
-    expr = expr.replace('&', '&&')
-    expr = expr.replace('|', '||')
-    expr = expr.replace('~', '!')
-    expr = expr.replace('>>', '->')
-    
-    return expr
+    return _sympy_back(str(expression))
 
 def format_logical_expression(expression):
     """
@@ -237,45 +275,21 @@ def format_logical_expression(expression):
     Specifically handles Implies() expressions to use arrow notation.
     
     Args:
-        expression (str): The SymPy expression string
+        expression: The SymPy expression
     
     Returns:
         str: Formatted expression with proper notation
     """
-    expr = str(expression)
-    
-    # Handle Implies() function format
-    if expr.startswith('Implies(') and expr.endswith(')'):
-        # Extract the content inside Implies()
-        inner_content = expr[8:-1]  # Remove 'Implies(' and the last ')'
-        
-        # Find the position of the comma that separates antecedent and consequent
-        # This is tricky because we need to account for nested parentheses
-        paren_count = 0
-        comma_pos = -1
-        
-        for i, char in enumerate(inner_content):
-            if char == '(':
-                paren_count += 1
-            elif char == ')':
-                paren_count -= 1
-            elif char == ',' and paren_count == 0:
-                comma_pos = i
-                break
-        
-        if comma_pos != -1:
-            antecedent = inner_content[:comma_pos].strip()
-            consequent = inner_content[comma_pos+1:].strip()
-            
-            # Convert operators in both parts
-            antecedent = convert_from_sympy_syntax(antecedent)
-            consequent = convert_from_sympy_syntax(consequent)
-            
-            # Format to arrow notation
-            return f"({antecedent}) -> {consequent}"
+    # Format implications straight from their arguments, no string parsing needed
+    if isinstance(expression, Implies):
+        antecedent, consequent = expression.args
+        return f"({_sympy_back(str(antecedent))}) -> {_sympy_back(str(consequent))}"
     
     # If not an Implies() expression, just use standard conversion
-    return convert_from_sympy_syntax(expr)
+    return convert_from_sympy_syntax(expression)
+
+# One 'X -> "original"' line of a Variable Mappings section
+_MAP_LINE_RE = re.compile(r'^([A-Z]+)\s*->\s*"(.*)"\s*$', re.MULTILINE)
 
 def get_variable_mappings(file_path='simplified_expression.txt'):
     """
@@ -287,28 +301,44 @@ def get_variable_mappings(file_path='simplified_expression.txt'):
     Returns:
         dict: Dictionary of variable mappings {variable: original_expression}
     """
-    mappings = {}
     try:
         with open(file_path, 'r') as f:
             content = f.read()
         
-        # Find the variable mappings section
-        if 'Variable Mappings:' in content:
-            mapping_section = content.split('Variable Mappings:')[1].strip()
-            
-            # Parse each mapping line
-            for line in mapping_section.split('\n'):
-                if '->' in line:
-                    var, expression = line.split('->', 1)
-                    var = var.strip()
-                    expression = expression.strip().strip('"')
-                    mappings[var] = expression
-        
-        return mappings
+        # Find the variable mappings section and parse all mapping lines in one scan
+        idx = content.find('Variable Mappings:')
+        if idx < 0:
+            return {}
+        return dict(_MAP_LINE_RE.findall(content, idx))
     except Exception as e:
         print(f"Error reading variable mappings: {e}")
         return {}
 
+# Operators or spaces in an expanded mapping that require wrapping it in parentheses
+_PAREN_TRIGGERS = ('&&', '||', '==', '!=', '>=', '<=', '>', '<', '+', '-', '*', '/', ' ')
+# Every character that can start one of the triggers above
+_PAREN_TRIGGER_CHARS = frozenset(''.join(_PAREN_TRIGGERS))
+
+def _has_op(value):
+    """Check whether an expanded mapping needs parentheses when substituted."""
+    # Plain variable names contain none of the trigger characters: one C-level scan
+    if _PAREN_TRIGGER_CHARS.isdisjoint(value):
+        return False
+    return any(op in value for op in _PAREN_TRIGGERS)
+
+# Relational expressions, optionally with one arithmetic operation on the right: A < B, A < B - C
+_RELATION_RE = re.compile(r'([A-Za-z0-9_.]+)\s*([<>=!]+)\s*([A-Za-z0-9_.]+(?:\s*[-+*/]\s*[A-Za-z0-9_.]+)?)')
+
+@lru_cache(maxsize=4096)
+def _word_re(var):
+    """Compiled whole-word pattern for a variable, shared across calls."""
+    return re.compile(r'\b' + re.escape(var) + r'\b')
+
+@lru_cache(maxsize=256)
+def _alternation_re(sorted_vars):
+    """Compiled whole-word alternation over a tuple of variables, shared across calls."""
+    return re.compile(r'\b(' + '|'.join(re.escape(var) for var in sorted_vars) + r')\b')
+
 def replace_variables_with_originals(simplified_expr, mappings):
     """
     Replace simplified variables with their original expressions.
@@ -332,104 +362,119 @@ def replace_variables_with_originals(simplified_expr, mappings):
     result = re.sub(r'!\s*\(\s*!\s*\(\s*([^<>]+)\s*>\s*([^<>]+)\s*\)\s*\)', r'(\1 > \2)', result)
     result = re.sub(r'!\s*\(\s*!\s*\(\s*([^<>]+)\s*<\s*([^<>]+)\s*\)\s*\)', r'(\1 < \2)', result)
     
-    # Create a function to recursively expand mappings
-    def expand_mapping(value, visited=None):
+    # Nothing to replace if no variable can occur in the expression
+    if {var[0] for var in mappings}.isdisjoint(result):
+        return result
+    
+    # Sort keys by length in descending order to handle longer variables first
+    # This prevents partial replacements of variables
+    sorted_vars = tuple(sorted(mappings.keys(), key=len, reverse=True))
+    
+    # Expansions resolved so far, so each mapping is expanded only once
+    resolved = {}
+    
+    def expand_mapping(value, visited):
         """Recursively expand a mapping value by replacing any variables it contains."""
-        if visited is None:
-            visited = set()
-        
         # Avoid infinite recursion
         if value in visited:
             return value
-        visited.add(value)
+        visited = visited | {value}
         
         expanded = value
-        # Sort keys by length in descending order to handle longer variables first
-        sorted_vars = sorted(mappings.keys(), key=len, reverse=True)
-        
         for var in sorted_vars:
             if var != value:  # Don't replace the variable with itself
-                pattern = r'\b' + re.escape(var) + r'\b'
-                if re.search(pattern, expanded):
-                    # Recursively expand the mapping for this variable
-                    expanded_mapping = expand_mapping(mappings[var], visited.copy())
-                    expanded = re.sub(pattern, expanded_mapping, expanded)
+                pattern = _word_re(var)
+                if pattern.search(expanded):
+                    expanded = pattern.sub(resolve(var, visited), expanded)
         
         return expanded
     
-    # Create expanded mappings
-    expanded_mappings = {}
-    for var, value in mappings.items():
-        expanded_mappings[var] = expand_mapping(value)
+    def resolve(var, visited=frozenset()):
+        """Return the fully expanded mapping for a variable, computing it on first use."""
+        if var not in resolved:
+            resolved[var] = expand_mapping(mappings[var], visited)
+        return resolved[var]
     
-    # Sort keys by length in descending order to handle longer variables first
-    # This prevents partial replacements of variables
-    sorted_vars = sorted(expanded_mappings.keys(), key=len, reverse=True)
+    # Create expanded mappings
+    expanded_mappings = {var: resolve(var) for var in mappings}
     
-    # First pass: identify relational expressions to protect them from excessive parentheses
-    relational_matches = []
-    relational_patterns = [
-        r'([A-Za-z0-9_.]+)\s*([<>=!]+)\s*([A-Za-z0-9_.]+)',  # Simple relations: A < B
-        r'([A-Za-z0-9_.]+)\s*([<>=!]+)\s*([A-Za-z0-9_.]+\s*[-+*/]\s*[A-Za-z0-9_.]+)'  # Relations with operations: A < B - C
-    ]
+    # Single alternation over all variables, longest first to prevent partial replacements
+    alt_re = _alternation_re(sorted_vars)
     
-    for pattern in relational_patterns:
-        for match in re.finditer(pattern, result):
-            relational_matches.append((match.start(), match.end(), match.group()))
+    # First pass: expand variables inside relational expressions (A < B, A < B - C)
+    # without parentheses, rewriting each relation in place
+    def _expand_rel(match):
+        return alt_re.sub(lambda m: expanded_mappings[m.group(1)], match.group(0))
     
-    # Sort matches by start position in reverse to replace from end to start
-    relational_matches.sort(reverse=True)
-    
-    # Replace variables within the relational expressions first
-    for start, end, match_text in relational_matches:
-        # Find and replace variables in the match, but without adding parentheses
-        modified_match = match_text
-        for var in sorted_vars:
-            pattern = r'\b' + re.escape(var) + r'\b'
-            modified_match = re.sub(pattern, expanded_mappings[var], modified_match)
-        
-        # Update the result with the modified relational expression
-        result = result[:start] + modified_match + result[end:]
+    result = _RELATION_RE.sub(_expand_rel, result)
     
     # Second pass: replace remaining variables with parentheses as before
-    for var in sorted_vars:
-        pattern = r'\b' + re.escape(var) + r'\b'
+    def _repl(match):
         # Only add parentheses if the expanded mapping contains operators or spaces
-        expanded_value = expanded_mappings[var]
-        if any(op in expanded_value for op in ['&&', '||', '==', '!=', '>=', '<=', '>', '<', '+', '-', '*', '/', ' ']):
-            result = re.sub(pattern, f"({expanded_value})", result)
-        else:
-            result = re.sub(pattern, expanded_value, result)
+        expanded_value = expanded_mappings[match.group(1)]
+        return f"({expanded_value})" if _has_op(expanded_value) else expanded_value
+    
+    result = alt_re.sub(_repl, result)
     
     return result
 
-def save_to_csv(original_expr, simplified_expr, csv_file="B:\SIMPLIFIERLOCAL\SIMPLIFICATIONN\expressions.csv"):
+# CSV files opened by save_to_csv, keyed by absolute path and kept open for the whole run
+_csv_writers = {}
+
+def _get_csv_writer(csv_file):
+    """
+    Return the shared (handle, writer) pair for a CSV file, opening it on first use.
+    Writes the header if the file did not exist yet.
+    
+    Args:
+        csv_file (str): Path to the CSV file
+    
+    Returns:
+        tuple: (file_handle, csv_writer)
+    """
+    key = os.path.abspath(csv_file)
+    entry = _csv_writers.get(key)
+    if entry is None:
+        file_exists = os.path.isfile(csv_file)
+        handle = open(csv_file, 'a', newline='', encoding='utf-8', buffering=1 << 16)
+        atexit.register(handle.close)
+        writer = csv.writer(handle)
+        
+        # Write headers if file doesn't exist
+        if not file_exists:
+            writer.writerow(['original', 'simplified'])
+        
+        entry = _csv_writers[key] = (handle, writer)
+    return entry
+
+def save_to_csv(original_expr, simplified_expr, csv_file=r"B:\SIMPLIFIERLOCAL\SIMPLIFICATIONN\expressions.csv", writer=None):
     """
     Save original and simplified expressions to a CSV file.
+    The file stays open and buffered; rows reach disk on flush or at exit.
     
     Args:
         original_expr (str): The original expression
         simplified_expr (str): The simplified expression
         csv_file (str): Path to the CSV file
+        writer (csv.writer, optional): Writer to use instead of the shared one for csv_file
     """
-    import csv
-    import os
+    if writer is None:
+        writer = _get_csv_writer(csv_file)[1]
+    writer.writerow([original_expr, simplified_expr])
     
-    file_exists = os.path.isfile(csv_file)
+    return csv_file
+
+def save_to_csv_batch(rows, csv_file=r"B:\SIMPLIFIERLOCAL\SIMPLIFICATIONN\expressions.csv"):
+    """
+    Save many (original, simplified) expression pairs and flush them to disk.
     
-    with open(csv_file, 'a', newline='', encoding='utf-8') as csvfile:
-        fieldnames = ['original', 'simplified']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        
-        # Write headers if file doesn't exist
-        if not file_exists:
-            writer.writeheader()
-        
-        # Write the data
-        writer.writerow({
-            'original': original_expr,
-            'simplified': simplified_expr
-        })
+    Args:
+        rows (iterable): Pairs of (original_expr, simplified_expr)
+        csv_file (str): Path to the CSV file
+    """
+    handle, writer = _get_csv_writer(csv_file)
+    writer.writerows(rows)
+    handle.flush()
     
     return csv_file
 
@@ -448,9 +493,7 @@ def simplification():
         # Save mappings to file
         output_file = "SIMPLIFICATIONN/simplified_expression.txt"
         with open(output_file, "w", encoding='utf-8') as f:
-            f.write("logical statement: " + test_expr + "\n\n")
-            f.write("simplified statement : " + simplified_expr + "\n\n")
-            f.write(mappings)
+            f.write(f"logical statement: {test_expr}\n\nsimplified statement : {simplified_expr}\n\n{mappings}")
         
         # Now use SymPy to simplify the logical structure
         # Check if we have an implication
@@ -479,13 +522,7 @@ def simplification():
             # Get variable mappings and replace variables with originals
             if mappings:
                 # Extract mappings from the string
-                mapping_dict = {}
-                for line in mappings.split('\n'):
-                    if '->' in line:
-                        var, expression = line.split('->', 1)
-                        var = var.strip()
-                        expression = expression.strip().strip('"')
-                        mapping_dict[var] = expression
+                mapping_dict = dict(_MAP_LINE_RE.findall(mappings))
                 
                 final_expression = replace_variables_with_originals(formatted_expr, mapping_dict)
                 print("\nExpression with original variables:")
@@ -496,7 +533,7 @@ def simplification():
                     f.write("\nFinal simplified expression:\n" + final_expression)
                 
                 # Save to CSV file using the helper function
-                csv_file = save_to_csv(test_expr, final_expression)
+                csv_file = save_to_csv_batch([(test_expr, final_expression)])
                 print(f"\nResults saved to CSV file: {csv_file}")
     
     except Exception as e:
@@ -527,6 +564,8 @@ def batch_simplification(input_file):
         
         print(f"Found {len(expressions)} expressions to process.")
         
+        # Collect results and write them to the CSV file in one go
+        rows = []
         for i, expr in enumerate(expressions, 1):
             print(f"\n[{i}/{len(expressions)}] Processing: {expr}")
             try:
@@ -544,19 +583,13 @@ def batch_simplification(input_file):
                     formatted_expr = format_logical_expression(simplified)
                     
                     # Extract mappings from the string
-                    mapping_dict = {}
-                    for line in mappings.split('\n'):
-                        if '->' in line:
-                            var, expression = line.split('->', 1)
-                            var = var.strip()
-                            expression = expression.strip().strip('"')
-                            mapping_dict[var] = expression
+                    mapping_dict = dict(_MAP_LINE_RE.findall(mappings))
                     
                     # Replace variables with originals
                     final_expression = replace_variables_with_originals(formatted_expr, mapping_dict)
                     
-                    # Save to CSV file
-                    save_to_csv(expr, final_expression)
+                    # Queue for the CSV file
+                    rows.append((expr, final_expression))
                     print(f"Simplified: {final_expression}")
                 else:
                     print(f"Failed to parse expression: {expr}")
@@ -564,6 +597,7 @@ def batch_simplification(input_file):
             except Exception as e:
                 print(f"Error processing expression {i}: {e}")
         
+        save_to_csv_batch(rows)
         print("\nBatch processing completed. Results saved to CSV file.")
     
     except Exception as e:
@@ -606,9 +640,10 @@ def test_inequality_handling():
             print("\nFormatted logical expression:")
             print(formatted_expr)
 
-if __name__ == "__main__":
-    import sys
-    
+def main():
     # Automatically run batch simplification with the specified file
-    spec_file = "B:\SIMPLIFIERLOCAL\SIMPLIFICATIONN\SPECS\spec.txt"
+    spec_file = r"B:\SIMPLIFIERLOCAL\SIMPLIFICATIONN\SPECS\spec.txt"
     batch_simplification(spec_file)
+
+if __name__ == "__main__":
+    main()
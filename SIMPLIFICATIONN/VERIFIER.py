@@ -1,180 +1,119 @@
 from z3 import *
 from z3 import unsat
+import csv
 import re
 import os
-import pandas as pd
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
+# Operators, parentheses, identifiers and integers in a single alternation; any other
+# non-space character becomes a token of its own so the parser rejects it
+_TOKEN_RE = re.compile(r'>=|<=|==|!=|&&|\|\||->|[!()<>+\-]|[A-Za-z_][\w.]*|\d+|\S')
+
+# Variable names (and keywords) of a statement
+_VAR_RE = re.compile(r'\b[a-zA-Z_][a-zA-Z0-9_.]*\b')
+
+# Every "operand op operand" triple of a statement: (left var, left number, op, right var,
+# right number). The right operand is only looked ahead at, so it can start the next triple
+_USAGE_RE = re.compile(
+    r'(?<![\w.])(?:([a-zA-Z_][a-zA-Z0-9_.]*)|(\d+))'
+    r'(?=\s*([+\-]|[><=!]+)\s*(?:([a-zA-Z_][a-zA-Z0-9_.]*)|(-?\d+)))'
+)
+
+# Enum-like constants, always Int
+_ENUM_CONSTANTS = frozenset(['PLAY', 'REW', 'FF', 'EMPTY', 'DISCINSERT', 'EJECT'])
+# Prefixes of struct members (inputs, outputs, state)
+_STRUCT_PREFIXES = ('inp.', 'rtY.', 'rtDW.', 'dw.')
+# Sensor variables and specific input variables that are boolean
+_BOOL_SUBSTRINGS = ('_sens', 'Eject')
+_BOOL_SUFFIXES = ('DiscInsert', 'DiscEject')
+# Input variables that are boolean flags based on their usage in logical expressions
+_INPUT_FLAG_SUBSTRINGS = ('EnergyLow', 'Lmin', 'Lmax', 'ThetaZero', 'ThetaDotZero')
+
+def _is_bool_member(var_name):
+    """Check whether a struct member is a boolean flag rather than an Int"""
+    if any(x in var_name for x in _BOOL_SUBSTRINGS) or var_name.endswith(_BOOL_SUFFIXES):
+        return True
+    if 'is_' in var_name:
+        # State variables that hold enum values - these should be Int, not Bool
+        return False
+    return var_name == 'inp.anomaly' or (
+        var_name.startswith('inp.') and any(x in var_name for x in _INPUT_FLAG_SUBSTRINGS))
+
+@lru_cache(maxsize=None)
 def create_variable(var_name):
     """Create appropriate Z3 variable based on the variable name"""
-    if var_name.startswith('IN_') or var_name in ['PLAY', 'REW', 'FF', 'EMPTY', 'DISCINSERT', 'EJECT']:
+    if var_name.startswith('IN_') or var_name in _ENUM_CONSTANTS:
         # These look like constants/enum values
         return Int(var_name)
-    elif any(var_name.startswith(prefix) for prefix in ['inp.', 'rtY.', 'rtDW.', 'dw.']):
-        # Parts/properties of a struct - determine type based on usage
-        if any(x in var_name for x in ['_sens', 'Eject']) or var_name.endswith('DiscInsert') or var_name.endswith('DiscEject'):
-            # Sensor variables and specific input variables that are boolean
-            return Bool(var_name)
-        elif 'is_' in var_name:
-            # State variables that hold enum values - these should be Int, not Bool
-            return Int(var_name)
-        elif var_name == 'inp.anomaly':
-            # inp.anomaly is a boolean flag
-            return Bool(var_name)
-        elif var_name.startswith('inp.') and any(x in var_name for x in ['EnergyLow', 'Lmin', 'Lmax', 'ThetaZero', 'ThetaDotZero']):
-            # These input variables are boolean flags based on their usage in logical expressions
-            return Bool(var_name)
-        elif any(x in var_name for x in ['Time', 'Counter', 'Tick', 'Duration', 'Wait', 'u1', 'u2']):
-            # Time-related variables and input variables should be Int
-            return Int(var_name)
-        else:
-            return Int(var_name)
-    elif var_name in ['TWAIT', 'TIME', 'COUNTER', 'DURATION', 'u1', 'u2']:
-        # Common time-related variables and input variables
-        return Int(var_name)
-    else:
-        # Default to Int for variables that might be used in arithmetic
-        return Int(var_name)
+    if var_name.startswith(_STRUCT_PREFIXES) and _is_bool_member(var_name):
+        return Bool(var_name)
+    # State, time-related and counter variables, and anything that might be
+    # used in arithmetic, default to Int
+    return Int(var_name)
 
 def tokenize_statement(statement):
-    """Convert a statement string into tokens while preserving arithmetic operations"""
-    # First, handle spaces around minus signs in numbers
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*<\s*-\s*(\d+)', r'\1 < -\2', statement)
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*>\s*-\s*(\d+)', r'\1 > -\2', statement)
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*==\s*-\s*(\d+)', r'\1 == -\2', statement)
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*!=\s*-\s*(\d+)', r'\1 != -\2', statement)
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*>=\s*-\s*(\d+)', r'\1 >= -\2', statement)
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*<=\s*-\s*(\d+)', r'\1 <= -\2', statement)
-    
-    # Handle negative numbers in comparisons
-    statement = re.sub(r'-\s*(\d+)', r'-\1', statement)  # Remove spaces after minus sign
-    
-    # Mark arithmetic expressions to preserve them
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*\+\s*(\d+)', r'ARITH_ADD_\1_\2', statement)
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*-\s*(\d+)', r'ARITH_SUB_\1_\2', statement)
-    
-    # Handle variable-to-variable arithmetic
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*\+\s*(\w+(?:\.\w+)*)', r'ARITH_ADD_VAR_\1_\2', statement)
-    statement = re.sub(r'(\w+(?:\.\w+)*)\s*-\s*(\w+(?:\.\w+)*)', r'ARITH_SUB_VAR_\1_\2', statement)
-    
-    # Replace multi-character operators with unique placeholders
-    replacements = {
-        '&&': ' AND ',
-        '||': ' OR ',
-        '->': ' IMPLIES ',
-        '==': ' EQUALS ',
-        '!=': ' NOTEQUALS ',
-        '>=': ' GEQ ',
-        '<=': ' LEQ ',
-        '!': ' NOT '
-    }
-    
-    for op, placeholder in replacements.items():
-        statement = statement.replace(op, placeholder)
-    
-    # Add spaces around remaining operators and parentheses
-    statement = statement.replace('(', ' ( ').replace(')', ' ) ')
+    """Convert a statement string into tokens; arithmetic operators are separate tokens"""
+    return _TOKEN_RE.findall(statement)
+
+def _wrap_top_level_implies(tokens):
+    """Parenthesize both sides of the first implication not inside parentheses"""
+    depth = 0
+    for i, token in enumerate(tokens):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            depth -= 1
+        elif token == '->' and depth == 0:
+            return ['('] + tokens[:i] + [')', '->', '('] + tokens[i + 1:] + [')']
+    return tokens
+
+@lru_cache(maxsize=4096)
+def _tokenize_cached(statement):
+    """Memoized tokenize_statement, normalized for the parser
     
-    # Handle > and < operators carefully to avoid splitting >= and <=
-    # First replace >= and <= with placeholders
-    statement = statement.replace('>=', ' GEQ ').replace('<=', ' LEQ ')
-    # Then handle remaining > and <
-    statement = statement.replace('>', ' > ').replace('<', ' < ')
+    Returns a tuple so cached tokens stay immutable.
+    """
+    tokens = tokenize_statement(statement)
     
-    # Split into tokens and replace placeholders back
-    tokens = statement.split()
-    for i, token in enumerate(tokens):
-        if token == 'AND': tokens[i] = '&&'
-        elif token == 'OR': tokens[i] = '||'
-        elif token == 'IMPLIES': tokens[i] = '->'
-        elif token == 'EQUALS': tokens[i] = '=='
-        elif token == 'NOTEQUALS': tokens[i] = '!='
-        elif token == 'GEQ': tokens[i] = '>='
-        elif token == 'LEQ': tokens[i] = '<='
-        elif token == 'NOT': tokens[i] = '!'
-        # Restore arithmetic expressions
-        elif token.startswith('ARITH_ADD_'):
-            parts = token.split('_', 2)
-            if len(parts) >= 3:
-                var_name = parts[2].rsplit('_', 1)[0]
-                num = parts[2].rsplit('_', 1)[1]
-                tokens[i] = f"{var_name}+{num}"
-        elif token.startswith('ARITH_SUB_'):
-            parts = token.split('_', 2)
-            if len(parts) >= 3:
-                var_name = parts[2].rsplit('_', 1)[0]
-                num = parts[2].rsplit('_', 1)[1]
-                tokens[i] = f"{var_name}-{num}"
-        elif token.startswith('ARITH_ADD_VAR_'):
-            parts = token.split('_', 3)
-            if len(parts) >= 4:
-                var1 = parts[3].split('_', 1)[0]
-                var2 = parts[3].split('_', 1)[1]
-                tokens[i] = f"{var1}+{var2}"
-        elif token.startswith('ARITH_SUB_VAR_'):
-            parts = token.split('_', 3)
-            if len(parts) >= 4:
-                var1 = parts[3].split('_', 1)[0]
-                var2 = parts[3].split('_', 1)[1]
-                tokens[i] = f"{var1}-{var2}"
+    # Add outer parentheses if not present
+    if not tokens or tokens[0] != '(':
+        tokens = ['('] + tokens + [')']
     
-    return tokens
+    # Ensure implications are properly parenthesized
+    return tuple(_wrap_top_level_implies(tokens))
 
-def get_arith_expr(expr_str, variables, var_types=None):
-    """Parse and create Z3 arithmetic expression"""
-    # First handle negative numbers and variables
-    if expr_str.startswith('-'):
-        # Handle negative numbers
-        if expr_str[1:].isdigit():
-            return -int(expr_str[1:])
-        # Handle negative variables
-        var_name = expr_str[1:]
-        if var_name not in variables:
-            variables[var_name] = create_variable(var_name)
-        return -variables[var_name]
+def parse_arith_term(tokens, idx, variables, var_types=None):
+    """Parse a single arithmetic operand: a variable, an integer constant,
+    a negated operand or a parenthesized arithmetic expression"""
+    if idx >= len(tokens):
+        raise ValueError("Unexpected end of expression")
     
-    if '+' in expr_str:
-        parts = expr_str.split('+')
-        if len(parts) == 2:
-            # Handle variable + constant
-            if parts[1].strip().isdigit():
-                var_name = parts[0].strip()
-                if var_name not in variables:
-                    variables[var_name] = create_variable(var_name)
-                return variables[var_name] + int(parts[1])
-            # Handle variable + variable
-            else:
-                var1 = parts[0].strip()
-                var2 = parts[1].strip()
-                if var1 not in variables:
-                    variables[var1] = create_variable(var1)
-                if var2 not in variables:
-                    variables[var2] = create_variable(var2)
-                return variables[var1] + variables[var2]
-    elif '-' in expr_str:
-        parts = expr_str.split('-')
-        if len(parts) == 2:
-            # Handle variable - constant
-            if parts[1].strip().isdigit():
-                var_name = parts[0].strip()
-                if var_name not in variables:
-                    variables[var_name] = create_variable(var_name)
-                return variables[var_name] - int(parts[1])
-            # Handle variable - variable
-            else:
-                var1 = parts[0].strip()
-                var2 = parts[1].strip()
-                if var1 not in variables:
-                    variables[var1] = create_variable(var1)
-                if var2 not in variables:
-                    variables[var2] = create_variable(var2)
-                return variables[var1] - variables[var2]
-    elif expr_str.isdigit():
-        return int(expr_str)
+    term = tokens[idx]
+    if term == '-':
+        idx, value = parse_arith_term(tokens, idx + 1, variables, var_types)
+        return idx, -value
+    elif term == '(':
+        idx, value = parse_arith(tokens, idx + 1, variables, var_types)
+        if idx >= len(tokens) or tokens[idx] != ')':
+            raise ValueError("Expected ')' after arithmetic expression")
+        return idx + 1, value
+    elif term.isdigit():
+        return idx + 1, int(term)
     else:
-        # Handle single variable
-        if expr_str not in variables:
-            variables[expr_str] = create_variable(expr_str)
-        return variables[expr_str]
+        if term not in variables:
+            variables[term] = create_variable(term)
+        return idx + 1, variables[term]
+
+def parse_arith(tokens, idx, variables, var_types=None):
+    """Parse an arithmetic expression: operands joined by '+' and '-'"""
+    idx, value = parse_arith_term(tokens, idx, variables, var_types)
+    while idx < len(tokens) and tokens[idx] in ['+', '-']:
+        op = tokens[idx]
+        idx, right = parse_arith_term(tokens, idx + 1, variables, var_types)
+        value = value + right if op == '+' else value - right
+    return idx, value
 
 def parse_expression(tokens, idx, variables, var_types=None):
     """Recursive descent parser for expressions"""
@@ -213,23 +152,16 @@ def parse_expression(tokens, idx, variables, var_types=None):
         idx, term = parse_expression(tokens, idx + 1, variables, var_types)
         return idx, Not(term)
     else:
-        # Parse a variable, constant, or comparison
-        if idx + 2 < len(tokens) and tokens[idx + 1] in ['==', '!=', '>', '<', '>=', '<=']:
-            # This is a comparison
-            left_str = tokens[idx]
-            op = tokens[idx + 1]
-            right_str = tokens[idx + 2]
+        # Parse a variable, constant, comparison, or arithmetic expression
+        next_token = tokens[idx + 1] if idx + 1 < len(tokens) else None
+        if tokens[idx] == '-' or next_token in ['+', '-', '==', '!=', '>', '<', '>=', '<=']:
+            idx, left_val = parse_arith(tokens, idx, variables, var_types)
+            if idx >= len(tokens) or tokens[idx] not in ['==', '!=', '>', '<', '>=', '<=']:
+                return idx, left_val
             
-            # Handle arithmetic in comparisons
-            if left_str.isdigit() or (left_str.startswith('-') and left_str[1:].isdigit()):
-                left_val = int(left_str)
-            else:
-                left_val = get_arith_expr(left_str, variables, var_types)
-                
-            if right_str.isdigit() or (right_str.startswith('-') and right_str[1:].isdigit()):
-                right_val = int(right_str)
-            else:
-                right_val = get_arith_expr(right_str, variables, var_types)
+            # This is a comparison
+            op = tokens[idx]
+            idx, right_val = parse_arith(tokens, idx + 1, variables, var_types)
             
             if op == '==':
                 expr = left_val == right_val
@@ -244,7 +176,7 @@ def parse_expression(tokens, idx, variables, var_types=None):
             elif op == '<=':
                 expr = left_val <= right_val
             
-            return idx + 3, expr
+            return idx, expr
         else:
             # This is a single variable or constant
             term = tokens[idx]
@@ -252,17 +184,13 @@ def parse_expression(tokens, idx, variables, var_types=None):
                 return idx + 1, True
             elif term.lower() == 'false':
                 return idx + 1, False
-            elif term.isdigit() or (term.startswith('-') and term[1:].isdigit()):
+            elif term.isdigit():
                 return idx + 1, int(term)
             else:
-                # Handle potential arithmetic
-                if '+' in term or '-' in term:
-                    return idx + 1, get_arith_expr(term, variables, var_types)
-                else:
-                    if term not in variables:
-                        var_type = var_types.get(term, 'Bool') if var_types else 'Bool'
-                        variables[term] = create_variable_with_type(term, var_type)
-                    return idx + 1, variables[term]
+                if term not in variables:
+                    var_type = var_types.get(term, 'Bool') if var_types else 'Bool'
+                    variables[term] = create_variable_with_type(term, var_type)
+                return idx + 1, variables[term]
 
 def parse_subexpression(tokens, idx, variables, var_types=None):
     """Parse a subexpression within parentheses"""
@@ -307,25 +235,8 @@ def parse_statement(statement):
     # Analyze variable types based on usage context
     var_types = analyze_variable_types(statement)
     
-    # Add outer parentheses if not present
-    if not statement.strip().startswith('('):
-        statement = f"({statement})"
-    
-    # Ensure implications are properly parenthesized
-    # Look for -> not inside parentheses and add parentheses
-    balanced = 0
-    for i, char in enumerate(statement):
-        if char == '(':
-            balanced += 1
-        elif char == ')':
-            balanced -= 1
-        elif i < len(statement) - 1 and statement[i:i+2] == '->' and balanced == 0:
-            # Found implication at top level, add parentheses
-            statement = f"({statement[:i]}) -> ({statement[i+2:]})"
-            break
-    
-    # Tokenize the statement
-    tokens = tokenize_statement(statement)
+    # Tokenize the statement (with outer parentheses and a parenthesized top-level implication)
+    tokens = _tokenize_cached(statement)
     
     # Dictionary to store variables
     variables = {}
@@ -335,107 +246,161 @@ def parse_statement(statement):
     
     return expr, variables
 
-def verify_pair(original, simplified):
-    """Verify if two logical statements are equivalent"""
+def make_solver():
+    """Create a solver tuned for propositional / linear integer equivalence checks
+    
+    Simplification, value propagation and equation solving run before the SMT
+    core, so many near-identical pairs are closed without a full search.
+    """
+    return Then('simplify', 'propagate-values', 'solve-eqs', 'smt').solver()
+
+def verify_pair(original, simplified, solver=None):
+    """Verify if two logical statements are equivalent
+    
+    A solver shared across calls can be passed in; each check runs inside its
+    own push()/pop() scope so no assertions leak between pairs.
+    """
     try:
-        # Analyze variable types from both statements combined for better inference
-        combined_statement = original + " " + simplified
-        var_types = analyze_variable_types(combined_statement)
+        # Identical statements are trivially equivalent; skip parsing and Z3
+        if original.strip() == simplified.strip():
+            return True, None
+        
+        # Analyze variable types of each statement (cached per string) and combine
+        # them for better inference: a variable used as an Int in either is an Int
+        var_types = dict(analyze_variable_types(original))
+        for var, var_type in analyze_variable_types(simplified).items():
+            if var_type == 'Int' or var not in var_types:
+                var_types[var] = var_type
         
         # Parse both statements with the combined type information
         expr1, vars1 = parse_statement_with_types(original, var_types)
         expr2, vars2 = parse_statement_with_types(simplified, var_types)
         
+        # Structurally identical formulas need no SAT check
+        if is_expr(expr1) and is_expr(expr2) and eq(expr1, expr2):
+            return True, None
+        
         # Combine variables from both statements
         all_vars = {**vars1, **vars2}
         
-        # Create Z3 solver
-        s = Solver()
+        # Create Z3 solver unless one is shared by the caller
+        if solver is None:
+            solver = make_solver()
         
-        # Check equivalence by testing if (expr1 <-> expr2) is always True
-        # This is equivalent to checking if (expr1 != expr2) is unsatisfiable
-        s.add(expr1 != expr2)
-        
-        result = s.check()
-        
-        if result == unsat:
-            return True, None
-        else:
-            m = s.model()
-            counterexample = {}
-            for var in sorted(all_vars.keys()):
-                if var in m:
-                    counterexample[var] = m[all_vars[var]]
-            return False, counterexample
+        solver.push()
+        try:
+            # Check equivalence by testing if (expr1 <-> expr2) is always True
+            # This is equivalent to checking if (expr1 != expr2) is unsatisfiable
+            solver.add(expr1 != expr2)
+            
+            result = solver.check()
+            
+            if result == unsat:
+                return True, None
+            else:
+                # The model must be read before pop() discards it
+                m = solver.model()
+                counterexample = {}
+                for var in sorted(all_vars.keys()):
+                    value = m[all_vars[var]]
+                    if value is not None:
+                        counterexample[var] = value
+                return False, counterexample
+        finally:
+            solver.pop()
             
     except Exception as e:
         return False, str(e)
 
+# Solver reused by every pair a worker process verifies
+_worker_solver = None
+
+def _verify_pair_worker(pair):
+    """Verify one (original, simplified) pair in a worker process
+    
+    Z3 values cannot be pickled back to the parent process, so counterexample
+    values are returned as strings.
+    """
+    global _worker_solver
+    if _worker_solver is None:
+        _worker_solver = make_solver()
+    
+    is_equivalent, result = verify_pair(pair[0], pair[1], _worker_solver)
+    if isinstance(result, dict):
+        result = {var: str(val) for var, val in result.items()}
+    return is_equivalent, result
+
 def parse_statement_with_types(statement, var_types):
     """Parse a logical statement with pre-determined variable types"""
-    # Add outer parentheses if not present
-    if not statement.strip().startswith('('):
-        statement = f"({statement})"
+    # Tokenize the statement (with outer parentheses and a parenthesized top-level implication)
+    tokens = _tokenize_cached(statement)
     
-    # Ensure implications are properly parenthesized
-    # Look for -> not inside parentheses and add parentheses
-    balanced = 0
-    for i, char in enumerate(statement):
-        if char == '(':
-            balanced += 1
-        elif char == ')':
-            balanced -= 1
-        elif i < len(statement) - 1 and statement[i:i+2] == '->' and balanced == 0:
-            # Found implication at top level, add parentheses
-            statement = f"({statement[:i]}) -> ({statement[i+2:]})"
-            break
+    # Only the types of names occurring in the statement affect the parse, so
+    # they form the cache key together with the statement
+    types = frozenset((token, var_types[token]) for token in set(tokens) if token in var_types)
+    expr, variables = _parse_cached(statement, types)
     
-    # Tokenize the statement
-    tokens = tokenize_statement(statement)
+    # Copy so callers never mutate the cached dictionary
+    return expr, dict(variables)
+
+@lru_cache(maxsize=8192)
+def _parse_cached(statement, types):
+    """Memoized parse of a statement given the (name, type) pairs it uses
+    
+    Parsing is deterministic and Z3 variables are cached per name, so the
+    same inputs always produce the same formula.
+    """
+    tokens = _tokenize_cached(statement)
     
     # Dictionary to store variables
     variables = {}
     
     # Parse the expression
-    _, expr = parse_subexpression(tokens, 0, variables, var_types)
+    _, expr = parse_subexpression(tokens, 0, variables, dict(types))
     
     return expr, variables
 
+@lru_cache(maxsize=4096)
 def analyze_variable_types(statement):
     """Analyze how variables are used in the statement to infer their types"""
     var_types = {}
     
-    # Find all variables in the statement
-    variables = re.findall(r'\b[a-zA-Z_][a-zA-Z0-9_.]*\b', statement)
-    
-    for var in set(variables):
+    # Find all distinct variables in the statement
+    for var in {m.group(0) for m in _VAR_RE.finditer(statement)}:
         if var in ['true', 'false', 'True', 'False']:
             continue
-        if var.startswith('IN_') or var in ['PLAY', 'REW', 'FF', 'EMPTY', 'DISCINSERT', 'EJECT']:
+        if var.startswith('IN_') or var in _ENUM_CONSTANTS:
             var_types[var] = 'Int'  # Constants/enum values
             continue
             
         # Analyze usage context
         var_types[var] = 'Bool'  # Default to Bool
+    
+    # Promote variables to Int from how they are used, in a single scan
+    for left, left_num, op, right, right_num in _USAGE_RE.findall(statement):
+        int_var = None
+        if op in ('+', '-'):
+            # Arithmetic usage (suggests Int)
+            if left and (right or right_num):
+                int_var = left
+            elif left_num and right:
+                int_var = right
+        elif left:
+            # Comparison with numbers (could be Int) or with enum-like values (suggests Int)
+            if right_num or (right.startswith('IN_') and len(right) > 3 and not op.strip('=!')):
+                int_var = left
+            elif left.startswith('IN_') and len(left) > 3 and not op.strip('=!'):
+                int_var = right
+        elif right:
+            # Number compared with a variable
+            int_var = right
         
-        # Check for arithmetic usage (suggests Int)
-        if re.search(rf'\b{re.escape(var)}\s*[+\-]\s*\d+', statement) or \
-           re.search(rf'\d+\s*[+\-]\s*{re.escape(var)}', statement) or \
-           re.search(rf'\b{re.escape(var)}\s*[+\-]\s*\b[a-zA-Z_][a-zA-Z0-9_.]*\b', statement):
-            var_types[var] = 'Int'
-            
-        # Check for comparison with numbers (could be Int)
-        if re.search(rf'\b{re.escape(var)}\s*[><=!]+\s*-?\d+', statement) or \
-           re.search(rf'-?\d+\s*[><=!]+\s*{re.escape(var)}', statement):
-            var_types[var] = 'Int'
-            
-        # Check for comparison with enum-like values (suggests Int)
-        if re.search(rf'\b{re.escape(var)}\s*[=!]+\s*IN_\w+', statement) or \
-           re.search(rf'IN_\w+\s*[=!]+\s*{re.escape(var)}', statement):
-            var_types[var] = 'Int'
+        if var_types.get(int_var) == 'Bool':
+            var_types[int_var] = 'Int'
     
     return var_types
 
+@lru_cache(maxsize=None)
 def create_variable_with_type(var_name, var_type):
     """Create Z3 variable with specified type"""
     if var_type == 'Int':
@@ -450,40 +415,51 @@ def main():
     print("===============================================")
     
     try:
-        # Read the CSV file
-        df = pd.read_csv(r'B:\SIMPLIFIERLOCAL\SIMPLIFICATIONN\expressions.csv')
+        # Read the two needed columns of the CSV file, row by row
+        with open(r'B:\SIMPLIFIERLOCAL\SIMPLIFICATIONN\expressions.csv', newline='', encoding='utf-8') as f:
+            pairs = [(row['original'], row['simplified']) for row in csv.DictReader(f)]
         
         # Initialize counters
-        total = len(df)
+        total = len(pairs)
         equivalent = 0
         non_equivalent = 0
         errors = 0
+        # (pair number, original, simplified, result) of every pair that is not
+        # equivalent, collected for the detailed report
+        records = []
         
-        # Process each pair
-        for idx, row in df.iterrows():
-            # Show progress
-            progress = (idx + 1) / total * 100
-            print(f"\rVerifying pair {idx + 1}/{total} ({progress:.1f}%)", end="")
+        # Pairs are independent, so verify them across a process pool; results
+        # come back in input order
+        # Workers are spawned rather than forked: run_pipeline runs this stage next to
+        # the NL generator's threads, and forking a multi-threaded process can leave a
+        # lock held in the child and hang the pool
+        with ProcessPoolExecutor(mp_context=multiprocessing.get_context("spawn")) as executor:
+            verified = executor.map(_verify_pair_worker, pairs, chunksize=32)
             
-            is_equivalent, result = verify_pair(row['original'], row['simplified'])
-            
-            if is_equivalent:
-                equivalent += 1
-            else:
-                if isinstance(result, dict):
-                    print(f"\n\nNon-equivalent pair found at index {idx + 1}")
-                    print("Original:", row['original'])
-                    print("Simplified:", row['simplified'])
-                    print("Counterexample:")
-                    for var, val in result.items():
-                        print(f"  {var} = {val}")
-                    non_equivalent += 1
+            # Process each pair
+            for idx, ((original, simplified), (is_equivalent, result)) in enumerate(zip(pairs, verified)):
+                # Show progress
+                progress = (idx + 1) / total * 100
+                print(f"\rVerifying pair {idx + 1}/{total} ({progress:.1f}%)", end="")
+                
+                if is_equivalent:
+                    equivalent += 1
                 else:
-                    print(f"\n\nError at index {idx + 1}")
-                    print("Original:", row['original'])
-                    print("Simplified:", row['simplified'])
-                    print(f"Error: {result}")
-                    errors += 1
+                    records.append((idx + 1, original, simplified, result))
+                    if isinstance(result, dict):
+                        print(f"\n\nNon-equivalent pair found at index {idx + 1}")
+                        print("Original:", original)
+                        print("Simplified:", simplified)
+                        print("Counterexample:")
+                        for var, val in result.items():
+                            print(f"  {var} = {val}")
+                        non_equivalent += 1
+                    else:
+                        print(f"\n\nError at index {idx + 1}")
+                        print("Original:", original)
+                        print("Simplified:", simplified)
+                        print(f"Error: {result}")
+                        errors += 1
         
         # Print summary
         print("\n\nVerification Summary:")
@@ -493,31 +469,29 @@ def main():
         print(f"Non-equivalent pairs: {non_equivalent}")
         print(f"Errors: {errors}")
         
-        # Save results to a file
-        with open('verification_results.txt', 'w') as f:
-            f.write("Verification Summary:\n")
-            f.write("====================\n")
-            f.write(f"Total pairs processed: {total}\n")
-            f.write(f"Equivalent pairs: {equivalent}\n")
-            f.write(f"Non-equivalent pairs: {non_equivalent}\n")
-            f.write(f"Errors: {errors}\n")
-            
-            # Add detailed error information
-            if errors > 0 or non_equivalent > 0:
-                f.write("\nDetailed Results:\n")
-                f.write("================\n")
-                for idx, row in df.iterrows():
-                    is_equivalent, result = verify_pair(row['original'], row['simplified'])
-                    if not is_equivalent:
-                        f.write(f"\nPair {idx + 1}:\n")
-                        f.write(f"Original: {row['original']}\n")
-                        f.write(f"Simplified: {row['simplified']}\n")
-                        if isinstance(result, dict):
-                            f.write("Counterexample:\n")
-                            for var, val in result.items():
-                                f.write(f"  {var} = {val}\n")
-                        else:
-                            f.write(f"Error: {result}\n")
+        # Save results to a file, building the whole report first and writing it in one call
+        parts = [
+            "Verification Summary:",
+            "====================",
+            f"Total pairs processed: {total}",
+            f"Equivalent pairs: {equivalent}",
+            f"Non-equivalent pairs: {non_equivalent}",
+            f"Errors: {errors}",
+        ]
+        
+        # Add detailed error information
+        if errors > 0 or non_equivalent > 0:
+            parts.extend(["", "Detailed Results:", "================"])
+            for number, original, simplified, result in records:
+                parts.extend(["", f"Pair {number}:", f"Original: {original}", f"Simplified: {simplified}"])
+                if isinstance(result, dict):
+                    parts.append("Counterexample:")
+                    parts.extend(f"  {var} = {val}" for var, val in result.items())
+                else:
+                    parts.append(f"Error: {result}")
+        
+        with open('verification_results.txt', 'w', buffering=1 << 16) as f:
+            f.write('\n'.join(parts) + '\n')
         
         print("\nResults have been saved to verification_results.txt")
         
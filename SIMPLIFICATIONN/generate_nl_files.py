@@ -1,15 +1,85 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
 import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import requests
 from pathlib import Path
+from requests.adapters import HTTPAdapter
 
-OLLAMA_URL = "http://localhost:11434/api/generate"
-MODEL = "mistral:instruct"  
+# Optional faster event loop; the stdlib loop is used when uvloop is not installed
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
-PROMPT_TEMPLATE = '''Let's break down this logical statement according to the provided guidelines.
+log = logging.getLogger(__name__)
+
+OLLAMA_URL = "http://localhost:11434/api/chat"
+# Model used for translation; point this at a smaller quantization (e.g. mistral:7b-instruct-q4_K_S)
+# for faster decoding
+MODEL = os.getenv("OLLAMA_MODEL", "mistral:instruct")
+# Requests kept in flight at once; match the OLLAMA_NUM_PARALLEL the server runs with
+MAX_CONCURRENT_REQUESTS = int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+# Keep the model loaded between requests instead of reloading its weights
+KEEP_ALIVE = "30m"
+# Options that shape the translation itself. num_predict and the stop sequence bound
+# decode time if the model starts rambling; a low temperature keeps translations close
+# to deterministic. No stop string may be text a valid answer can start with (such as
+# "Logical Statement:", which both prompts use), or the reply is cut off empty
+GENERATION_OPTIONS = {
+    "num_predict": 400,
+    "temperature": 0.2,
+    "top_p": 0.9,
+    "stop": ["\n\n\n"]
+}
+# Options sent with every request. Prompts are short, so one 512-token batch covers
+# the whole prefill; num_thread is left to Ollama (physical cores) unless set
+OPTIONS = {"num_batch": 512, **GENERATION_OPTIONS}
+if os.getenv("OLLAMA_NUM_THREAD"):
+    OPTIONS["num_thread"] = int(os.getenv("OLLAMA_NUM_THREAD"))
+
+# On-disk cache of generated translations, so reruns skip rows already translated
+CACHE_PATH = os.path.join(os.path.dirname(__file__), '.nl_cache.sqlite3')
+# Seconds a cached translation stays valid; 0 keeps entries forever
+CACHE_TTL = float(os.getenv("NL_CACHE_TTL", "0"))
+
+# One session per worker thread, so each keeps its own connection to Ollama alive
+# and reuses it, without threads sharing a session's state
+_thread_local = threading.local()
+
+def _get_session():
+    """Return this thread's requests session, creating it on first use"""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        # A worker only has one request in flight at a time
+        session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        _thread_local.session = session
+    return session
+
+# Static instructions, sent as the system message so the prompt prefix is identical
+# for every row and Ollama can reuse its cached prefill
+CONCISE_SYSTEM_PROMPT = (
+    "You translate logical statements into natural language for a technical audience. "
+    "Rewrite the statement in the user message as a precise, concise description of its "
+    "conditions: keep every variable name, state every AND, OR, NOT and implication "
+    "explicitly, and list the conditions where that helps readability. "
+    "Output only the final translation and nothing else."
+)
+
+# The original multi-expert template; longer to prefill, kept so output quality can be compared
+VERBOSE_SYSTEM_PROMPT = '''Let's break down the logical statement given by the user according to the provided guidelines.
 
 **1. Logical Statement:**
-{logical_statement}
+The logical statement in the user message.
 
 **2. Step 1: Logical Decomposition**
 
@@ -55,31 +125,280 @@ PROMPT_TEMPLATE = '''Let's break down this logical statement according to the pr
 
 Strictly follow the structure of the guidelines and the example provided. In the output just display the final translation and nothing else. Do not add the verbose of the previous steps.'''
 
-def logical_to_natural_language(logical_expr, model=MODEL):
-    prompt = PROMPT_TEMPLATE.format(logical_statement=logical_expr)
-    response = requests.post(
+# Set VERBOSE_PROMPT=1 to translate with the original template
+SYSTEM_PROMPT = VERBOSE_SYSTEM_PROMPT if os.getenv("VERBOSE_PROMPT", "0") == "1" else CONCISE_SYSTEM_PROMPT
+
+USER_PROMPT_TEMPLATE = "Logical Statement:\n{logical_statement}"
+
+# Tokens of a logical expression, used to canonicalize cache keys
+_TOKEN_RE = re.compile(r'>=|<=|==|!=|&&|\|\||->|[A-Za-z_][\w.]*|\d+|\S')
+
+_cache_conn = None
+_cache_lock = threading.Lock()
+
+def _get_cache():
+    """Open the response cache on first use"""
+    global _cache_conn
+    if _cache_conn is None:
+        _cache_conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT, created REAL)"
+        )
+    return _cache_conn
+
+def _wraps_all(tokens):
+    """Return True if tokens is a single parenthesized group, e.g. ( a && ( b ) )"""
+    if not tokens or tokens[0] != "(":
+        return False
+    depth = 0
+    for i, tok in enumerate(tokens):
+        if tok == "(":
+            depth += 1
+        elif tok == ")":
+            depth -= 1
+            if depth == 0:
+                return i == len(tokens) - 1
+    return False
+
+def _canonical_tokens(tokens):
+    """Serialize tokens with the operands of every top-level && and || sorted"""
+    while _wraps_all(tokens):
+        tokens = tokens[1:-1]
+    if not tokens:
+        raise ValueError("empty operand")
+    
+    # Split at the loosest-binding operator found outside parentheses
+    for op in ("->", "||", "&&"):
+        parts = [[]]
+        depth = 0
+        for tok in tokens:
+            if tok == "(":
+                depth += 1
+            elif tok == ")":
+                depth -= 1
+                if depth < 0:
+                    raise ValueError("unbalanced parentheses")
+            if tok == op and depth == 0:
+                parts.append([])
+            else:
+                parts[-1].append(tok)
+        if depth != 0:
+            raise ValueError("unbalanced parentheses")
+        if len(parts) > 1:
+            operands = [f"({_canonical_tokens(part)})" for part in parts]
+            # Implication is not commutative, so only && and || operands are reordered
+            if op != "->":
+                operands.sort()
+            return f" {op} ".join(operands)
+    
+    # Negation of a name or of a parenthesized group; anything else is kept as one atom
+    if tokens[0] == "!" and (len(tokens) == 2 or _wraps_all(tokens[1:])):
+        return f"!({_canonical_tokens(tokens[1:])})"
+    return " ".join(tokens)
+
+def _canonical_expression(logical_expr):
+    """Canonical form of an expression, equal for expressions that differ only in
+    whitespace, redundant outer parentheses or the order of && / || operands"""
+    try:
+        return _canonical_tokens(_TOKEN_RE.findall(logical_expr))
+    except ValueError:
+        # Malformed expressions are only matched exactly
+        return "raw:" + " ".join(logical_expr.split())
+
+def _cache_key(logical_expr, model):
+    # The prompt and generation options are part of the key so changing them
+    # invalidates old translations. Expressions are canonicalized first, so
+    # reordered or reformatted duplicates share one translation
+    options = json.dumps(GENERATION_OPTIONS, sort_keys=True)
+    expr = _canonical_expression(logical_expr)
+    return hashlib.sha256(f"{model}|{SYSTEM_PROMPT}|{options}|{expr}".encode("utf-8")).hexdigest()
+
+def _cache_get(key):
+    """Return the cached translation for key, or None if missing or expired"""
+    with _cache_lock:
+        row = _get_cache().execute(
+            "SELECT response, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+    if row is None or (CACHE_TTL > 0 and time.time() - row[1] > CACHE_TTL):
+        return None
+    return row[0]
+
+def _cache_set(key, response):
+    with _cache_lock:
+        conn = _get_cache()
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, response, created) VALUES (?, ?, ?)",
+            (key, response, time.time())
+        )
+        conn.commit()
+
+def logical_to_natural_language(logical_expr, model=MODEL, refresh=False):
+    """Translate a logical expression to natural language
+    
+    With refresh set, the cache is bypassed and the fresh reply replaces the cached one.
+    """
+    key = _cache_key(logical_expr, model)
+    cached = None if refresh else _cache_get(key)
+    if cached is not None:
+        return cached
+    
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": USER_PROMPT_TEMPLATE.format(logical_statement=logical_expr)}
+    ]
+    response = _get_session().post(
         OLLAMA_URL,
         json={
             "model": model,
-            "prompt": prompt,
-            "stream": False
-        }
+            "messages": messages,
+            "stream": True,
+            "keep_alive": KEEP_ALIVE,
+            "options": OPTIONS
+        },
+        timeout=(10, 300),
+        stream=True
     )
-    print("----------------------------")
-    return response.json()["response"].strip()
+    
+    # Consume the streamed chunks as they arrive instead of buffering one large JSON body
+    parts = []
+    done = False
+    with response:
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                raise RuntimeError(f"Ollama error: {chunk['error']}")
+            parts.append(chunk.get("message", {}).get("content", ""))
+            if chunk.get("done"):
+                done = True
+                break
+    
+    # A stream cut off before its final chunk holds only part of the reply;
+    # fail the row rather than save it, so it is retried on the next run
+    if not done:
+        raise RuntimeError("Ollama stream ended before the reply was complete")
+    
+    log.debug("Translated: %s", logical_expr)
+    nl = "".join(parts).strip()
+    # Only complete, non-empty translations are worth serving again
+    if nl:
+        _cache_set(key, nl)
+    return nl
+
+def warm_up(model=MODEL):
+    """Load the model and prefill the system prompt before the real requests"""
+    # Same options as the real requests (other than num_predict), since Ollama reloads
+    # the model when load-time options such as num_batch change
+    try:
+        response = _get_session().post(
+            OLLAMA_URL,
+            json={
+                "model": model,
+                "messages": [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": USER_PROMPT_TEMPLATE.format(logical_statement="warmup")}
+                ],
+                "stream": False,
+                "keep_alive": KEEP_ALIVE,
+                "options": {**OPTIONS, "num_predict": 1}
+            },
+            timeout=(10, 300)
+        )
+        response.raise_for_status()
+        # load_duration is in nanoseconds and drops to 0 once the model is resident
+        load_duration = response.json().get("load_duration", 0) / 1e9
+    except (requests.RequestException, ValueError) as e:
+        # Not fatal; the real requests report any lasting problem
+        log.warning("Warm-up request failed: %s", e)
+        return
+    log.info("Model %s ready (load took %.1fs)", model, load_duration)
+
+async def generate_one(sem, executor, idx, simplified, out, refresh=False):
+    """Translate one expression (at most MAX_CONCURRENT_REQUESTS at a time) and append it to out"""
+    async with sem:
+        # The HTTP call blocks, so run it in a worker thread to overlap requests
+        loop = asyncio.get_running_loop()
+        nl = await loop.run_in_executor(executor, logical_to_natural_language, simplified, MODEL, refresh)
+    # Only the event loop thread writes, so records never interleave; flush so
+    # finished rows survive an interrupted run
+    out.write(json.dumps({"idx": idx, "simplified": simplified, "nl": nl}) + "\n")
+    out.flush()
+    log.info("Saved: row %d", idx)
+
+async def generate_all(rows, out, refresh=False):
+    sem = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    # One worker thread per request slot the server decodes in parallel
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+        await asyncio.gather(*(generate_one(sem, executor, idx, simplified, out, refresh)
+                               for idx, simplified in rows))
+
+def load_done(output_path, rows):
+    """Return the records in output_path that still match a row of rows"""
+    if not os.path.exists(output_path):
+        return []
+    wanted = set(rows)
+    done = []
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by an interrupted run; that row is redone
+                continue
+            # Keep a record only if its row still holds the same expression and it has
+            # a translation; empty replies are not cached either, so they get retried
+            if (record["idx"], record["simplified"]) in wanted and record.get("nl"):
+                done.append(record)
+                wanted.discard((record["idx"], record["simplified"]))
+    return done
 
-def main():
+def main(force=False):
     csv_path = os.path.join(os.path.dirname(__file__), 'expressions.csv')
-    output_dir = os.path.join(os.path.dirname(__file__), 'nl_outputs')
-    os.makedirs(output_dir, exist_ok=True)
-    df = pd.read_csv(csv_path)
-    for idx, row in df.iterrows():
-        simplified = row["simplified"]
-        nl = logical_to_natural_language(simplified)
-        out_path = os.path.join(output_dir, f"nl_{idx}.txt")
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(f"Logical Statement:\n{simplified}\n\nFinal Combined Translation:\n{nl}\n")
-        print(f"Saved: {out_path}")
+    # All translations go to one JSON Lines file, one {"idx", "simplified", "nl"}
+    # record per row in completion order, rather than one small file per row
+    output_path = os.path.join(os.path.dirname(__file__), 'nl_outputs.jsonl')
+    # Keep every cell as text: tautologies come out as "True"/"False" and empty cells
+    # as "", which would otherwise be parsed as bools or NaN
+    df = pd.read_csv(csv_path, usecols=["simplified"], dtype=str, keep_default_na=False)
+    # Plain Python strings, rather than a pandas Series built for every row
+    rows = list(enumerate(df["simplified"].tolist()))
+    
+    # Resume: rows already translated by an earlier run are kept and skipped,
+    # unless force is set, in which case every row is translated afresh by the model
+    done = [] if force else load_done(output_path, rows)
+    done_keys = {(record["idx"], record["simplified"]) for record in done}
+    pending = [row for row in rows if row not in done_keys]
+    if done:
+        log.info("Skipping %d rows already in %s", len(done), output_path)
+    
+    # Load the model once up front so the first rows do not pay for it
+    if pending:
+        warm_up()
+    
+    # Rewrite the kept records first, dropping stale or partial lines, then
+    # append the new ones
+    with open(output_path, "w", encoding="utf-8") as out:
+        out.writelines(json.dumps(record) + "\n" for record in done)
+        out.flush()
+        # uvloop.run only exists from uvloop 0.18; older releases fall back to asyncio.run
+        run = getattr(uvloop, "run", None) or asyncio.run
+        run(generate_all(pending, out, refresh=force))
 
 if __name__ == "__main__":
-    main() 
+    parser = argparse.ArgumentParser(description="Translate simplified expressions to natural language")
+    parser.add_argument("--force", action="store_true",
+                        help="regenerate every row with the model, ignoring nl_outputs.jsonl and the translation cache")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile the run with cProfile and print where the time went")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.profile:
+        import cProfile
+        import pstats
+        profiler = cProfile.Profile()
+        profiler.runcall(main, force=args.force)
+        # Worker threads are not profiled; their time shows up as waiting in the main thread
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    else:
+        main(force=args.force)
@@ -1,35 +1,44 @@
+import asyncio
 import os
 import sys
-import subprocess
+import importlib.util
+import logging
 import time
 
-def run_script(script_name, description):
-    """Run a Python script and handle any errors"""
+def load_stage(script_name, module_name):
+    """Import a pipeline script as a module"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    script_path = os.path.join(script_dir, script_name)
+    
+    # Check if the script exists
+    if not os.path.exists(script_path):
+        raise FileNotFoundError(f"Script {script_name} not found at {script_path}")
+    
+    # Load by path, since "SYMPY SIMPLIFIER.py" is not a valid module name
+    spec = importlib.util.spec_from_file_location(module_name, script_path)
+    module = importlib.util.module_from_spec(spec)
+    # Register before executing so worker processes can find the module again
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def run_stage(script_name, module_name, description):
+    """Run a pipeline script's main() in this process and handle any errors"""
     print(f"\n{'='*60}")
     print(f"Running {description}...")
     print(f"{'='*60}")
     
     try:
-        # Get the absolute path to the script directory
+        # Run the stage from the script directory, as the scripts expect
         script_dir = os.path.dirname(os.path.abspath(__file__))
-        script_path = os.path.join(script_dir, script_name)
-        
-        # Check if the script exists
-        if not os.path.exists(script_path):
-            print(f"Error: Script {script_name} not found at {script_path}")
-            return False
+        os.chdir(script_dir)
         
-        # Run the script from the script directory
-        result = subprocess.run([sys.executable, script_path], 
-                              capture_output=False, 
-                              text=True, 
-                              cwd=script_dir)
+        start = time.perf_counter()
+        module = sys.modules.get(module_name) or load_stage(script_name, module_name)
+        module.main()
+        elapsed = time.perf_counter() - start
         
-        if result.returncode == 0:
-            print(f"\n✓ {description} completed successfully!")
-        else:
-            print(f"\n✗ {description} failed with return code {result.returncode}")
-            return False
+        print(f"\n✓ {description} completed successfully in {elapsed:.1f}s!")
             
     except Exception as e:
         print(f"\n✗ Error running {description}: {str(e)}")
@@ -37,7 +46,16 @@ def run_script(script_name, description):
     
     return True
 
+async def run_stages_concurrently(*stages):
+    """Run independent stages at the same time and return whether each succeeded"""
+    # Both stages only read expressions.csv, so the CPU-bound verifier and the
+    # network-bound generator can overlap; each runs in its own thread
+    return await asyncio.gather(*(asyncio.to_thread(run_stage, *stage) for stage in stages))
+
 def main():
+    # Stages report per-row progress through logging
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     print("Logical Expression Processing Pipeline")
     print("=====================================")
     print()
@@ -48,18 +66,20 @@ def main():
     print()
     
     # Step 1: Run the simplifier
-    if not run_script("SYMPY SIMPLIFIER.py", "Logical Expression Simplifier"):
+    if not run_stage("SYMPY SIMPLIFIER.py", "sympy_simplifier", "Logical Expression Simplifier"):
         print("\nPipeline stopped due to simplifier failure.")
         return
     
-    # Step 2: Run the verifier
-    if not run_script("VERIFIER.py", "Expression Equivalence Verifier"):
-        print("\nPipeline stopped due to verifier failure.")
-        return
-    
-    # Step 3: Run the natural language generator
-    if not run_script("generate_nl_files.py", "Natural Language Generator"):
-        print("\nPipeline stopped due to natural language generator failure.")
+    # Steps 2 and 3: Run the verifier and the natural language generator side by side
+    verified, generated = asyncio.run(run_stages_concurrently(
+        ("VERIFIER.py", "VERIFIER", "Expression Equivalence Verifier"),
+        ("generate_nl_files.py", "generate_nl_files", "Natural Language Generator"),
+    ))
+    if not verified:
+        print("\nVerifier failed (NL generation ran concurrently).")
+    if not generated:
+        print("\nNatural language generator failed (verification ran concurrently).")
+    if not (verified and generated):
         return
     
     print(f"\n{'='*60}")
@@ -68,7 +88,7 @@ def main():
     print("\nResults:")
     print(f"- Simplified expressions: {os.path.join(script_dir, 'expressions.csv')}")
     print(f"- Verification results: {os.path.join(script_dir, 'verification_results.txt')}")
-    print(f"- Natural language files: {os.path.join(script_dir, 'nl_outputs/')} directory")
+    print(f"- Natural language translations: {os.path.join(script_dir, 'nl_outputs.jsonl')}")
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file